@@ -0,0 +1,15 @@
+import numba
+import numpy as np
+
+
+# Kept out of streamlit_movie.py: Streamlit re-executes the app script on every
+# rerun, which would create a new dispatcher (and reload the kernel) each time.
+# Imported modules are loaded once per process, so this is compiled once.
+@numba.njit(cache=True)
+def range_mask(rows, rating, budget, r0, r1, b0, b1):
+    # Rating and budget range checks fused into one pass over the candidate rows
+    out = np.empty(rows.shape[0], np.bool_)
+    for i in range(rows.shape[0]):
+        j = rows[i]
+        out[i] = (rating[j] >= r0) & (rating[j] <= r1) & (budget[j] >= b0) & (budget[j] <= b1)
+    return out
\ No newline at end of file
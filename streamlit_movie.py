@@ -1,11 +1,15 @@
+import os
+
 import altair as alt
 import numpy as np
 import pandas as pd
 import streamlit as st
 
 import folium
-from folium.plugins import MarkerCluster
-from streamlit_folium import st_folium
+import pydeck as pdk
+from folium.plugins import FastMarkerCluster
+
+from movie_filters import range_mask
 
 
 # --------------------------------------------------------------------------------------
@@ -28,27 +32,127 @@ Use the filters on the left to interactively explore the data.
 
 
 # --------------------------------------------------------------------------------------
-# Load & preprocess data (movies_with_coords.csv)
+# Load & preprocess data (movies_with_coords.parquet)
 # --------------------------------------------------------------------------------------
-@st.cache_data
-def load_data():
-    df = pd.read_csv("movies_with_coords.csv")
+DATA_CSV = "movies_with_coords.csv"
+DATA_PARQUET = "movies_with_coords.parquet"
+
+# Upper bound on points sent to the browser for the budget/rating scatter
+SCATTER_MAX_POINTS = 5000
+
+# Rows per page in the data table
+TABLE_PAGE_SIZE = 100
+
+
+def convert_csv_to_parquet():
+    """One-off conversion of the raw CSV into a typed parquet file."""
+    raw = pd.read_csv(DATA_CSV)
 
     # startYear, averageRating, budget, numVotes, lat, lon, genres, title
-    df["startYear"] = pd.to_numeric(df["startYear"], errors="coerce")
-    df["averageRating"] = pd.to_numeric(df["averageRating"], errors="coerce")
-    df["budget"] = pd.to_numeric(df["budget"], errors="coerce")
-    df["numVotes"] = pd.to_numeric(df["numVotes"], errors="coerce")
-    df["lat"] = pd.to_numeric(df["lat"], errors="coerce")
-    df["lon"] = pd.to_numeric(df["lon"], errors="coerce")
+    for col in ["startYear", "averageRating", "budget", "numVotes", "lat", "lon"]:
+        raw[col] = pd.to_numeric(raw[col], errors="coerce")
+
+    raw.to_parquet(DATA_PARQUET, index=False)
+
+
+def csv_mtime():
+    """Modification time of the source CSV, or None if it is not present."""
+    return os.path.getmtime(DATA_CSV) if os.path.exists(DATA_CSV) else None
+
+
+@st.cache_data
+def load_data(source_mtime):
+    # source_mtime is only a cache key: an updated CSV invalidates the cached
+    # frame, and the parquet file is regenerated when it is older than the CSV
+    if not os.path.exists(DATA_PARQUET) or (
+        source_mtime is not None and source_mtime > os.path.getmtime(DATA_PARQUET)
+    ):
+        convert_csv_to_parquet()
+
+    # Column types are stored in the parquet file, no re-parsing needed
+    df = pd.read_parquet(DATA_PARQUET, dtype_backend="pyarrow")
+
+    # Narrower dtypes halve the bytes scanned by every filter pass.
+    # Floats stay float64: ratings, budgets and coordinates are displayed and
+    # serialized as-is, and float32 would show 7.3 as 7.300000190734863.
+    # genres stays a pyarrow string (not Categorical) for fast isin/groupby.
+    df = df.astype({
+        "startYear": "int32[pyarrow]",
+        "numVotes": "int32[pyarrow]",
+        "averageRating": "float64[pyarrow]",
+        "budget": "float64[pyarrow]",
+        "lat": "float64[pyarrow]",
+        "lon": "float64[pyarrow]",
+    })
 
     df["genres"] = df["genres"].fillna("\\N")
     df["genres"] = df["genres"].replace("\\N", np.nan)
 
-    return df
+    # Rows sorted by year (missing years last) so the year filter is a slice
+    df = df.sort_values("startYear", kind="mergesort").reset_index(drop=True)
+
+    # Raw numpy views of the filtered columns (NaN for missing) for the filter kernel
+    filter_arrays = {
+        "startYear": df["startYear"].to_numpy(dtype=np.float64, na_value=np.nan),
+        "averageRating": df["averageRating"].to_numpy(dtype=np.float64, na_value=np.nan),
+        "budget": df["budget"].to_numpy(dtype=np.float64, na_value=np.nan),
+    }
+
+    # genre -> sorted row positions, so the genre filter only touches matching rows
+    genre_index = df.groupby("genres", sort=False).indices
+
+    # Map popups are built once here instead of per row on every rerun.
+    # Each piece is a nullable string filled with "N/A" so a missing value
+    # never nulls out the whole concatenation.
+    title_s = df["title"].astype("string[pyarrow]").fillna("N/A")
+    year_s = df["startYear"].astype("string[pyarrow]").fillna("N/A")
+    genre_s = df["genres"].astype("string[pyarrow]").fillna("N/A")
+    rating_s = df["averageRating"].round(2).astype("string[pyarrow]").fillna("N/A")
+    budget_s = df["budget"].map(lambda x: f"{int(x):,}" if pd.notna(x) else "N/A")
+    df["popup_html"] = (
+        "<b>" + title_s + "</b>"
+        + "<br>Year: " + year_s
+        + "<br>Genre: " + genre_s
+        + "<br>Rating: " + rating_s
+        + "<br>Budget: " + budget_s
+    )
 
+    # Derived columns (popup_html) come back as object; keep every column
+    # pyarrow-backed (convert_integer=False keeps whole-number floats as floats)
+    df = df.convert_dtypes(dtype_backend="pyarrow", convert_integer=False)
 
-df = load_data()
+    # Sidebar bounds are constants of the data, so compute them once here
+    stats = {}
+
+    valid_years = df["startYear"].dropna()
+    if not valid_years.empty:
+        stats["min_year"] = int(valid_years.min())
+        stats["max_year"] = int(valid_years.max())
+    else:
+        stats["min_year"], stats["max_year"] = 1900, 2025
+
+    budget_valid = df["budget"].dropna()
+    if not budget_valid.empty:
+        b_min, b_max = budget_valid.quantile([0.05, 0.95])
+        stats["b_min"], stats["b_max"] = float(b_min), float(b_max)
+    else:
+        stats["b_min"], stats["b_max"] = 0.0, 1.0
+
+    ratings_valid = df["averageRating"].dropna()
+    if not ratings_valid.empty:
+        stats["min_rating"] = float(ratings_valid.min())
+        stats["max_rating"] = float(ratings_valid.max())
+    else:
+        stats["min_rating"], stats["max_rating"] = 0.0, 10.0
+
+    stats["genres_list"] = sorted(genre_index)
+
+    return df, stats, filter_arrays, genre_index
+
+
+# Changes whenever the CSV is updated; part of every cache key built on df
+data_version = csv_mtime()
+df, stats, filter_arrays, genre_index = load_data(data_version)
 
 # --------------------------------------------------------------------------------------
 # Sidebar Filters
@@ -56,12 +160,7 @@ df = load_data()
 st.sidebar.header("Filters")
 
 # 1) Year range slider
-valid_years = df["startYear"].dropna()
-if not valid_years.empty:
-    min_year = int(valid_years.min())
-    max_year = int(valid_years.max())
-else:
-    min_year, max_year = 1900, 2025
+min_year, max_year = stats["min_year"], stats["max_year"]
 
 years = st.sidebar.slider(
     "Release Year",
@@ -71,13 +170,7 @@ years = st.sidebar.slider(
 )
 
 # 2) Genre multiselect
-genres_list = (
-    df["genres"]
-    .dropna()
-    .unique()
-    .tolist()
-)
-genres_list = sorted(genres_list)
+genres_list = stats["genres_list"]
 
 if genres_list:
     default_genres = [x for x in genres_list if x in ['Action', 'Comedy', 'Drama']]
@@ -90,13 +183,7 @@ else:
     selected_genres = []
 
 # 3) Budget slider
-budget_valid = df["budget"].dropna() 
-if not budget_valid.empty: 
-    b_min, b_max = budget_valid.quantile([0.05, 0.95]) 
-    b_min = float(b_min) 
-    b_max = float(b_max) 
-else: 
-    b_min, b_max = 0.0, float(budget_valid.max()) if not budget_valid.empty else 1.0
+b_min, b_max = stats["b_min"], stats["b_max"]
 
 budget_range = st.sidebar.slider("Budget (USD approx. 5% ~ 95% range)",
                                  min_value=float(b_min), max_value=float(b_max),
@@ -104,12 +191,7 @@ budget_range = st.sidebar.slider("Budget (USD approx. 5% ~ 95% range)",
                                 )
 
 # 4) Rating slider (success metric)
-ratings_valid = df["averageRating"].dropna()
-if not ratings_valid.empty:
-    min_rating = float(ratings_valid.min())
-    max_rating = float(ratings_valid.max())
-else:
-    min_rating, max_rating = 0.0, 10.0
+min_rating, max_rating = stats["min_rating"], stats["max_rating"]
 
 rating_range = st.sidebar.slider(
     "Average Rating (Success Metric)",
@@ -124,24 +206,115 @@ st.sidebar.caption("Success is defined as the **IMDB average rating**.")
 # --------------------------------------------------------------------------------------
 # Apply filters
 # --------------------------------------------------------------------------------------
-df_filtered = df.copy()
+@st.cache_data(show_spinner=False)
+def apply_filters(data_version, _df, _arrays, _index, years, genres, rating_range, budget_range):
+    # Underscored arguments are not hashed; data_version stands in for them.
+    # _df is sorted by year, so the year range is a contiguous slice
+    lo, hi = np.searchsorted(_arrays["startYear"], [years[0], years[1] + 1])
+
+    if genres:
+        # Rows of the selected genres, narrowed to the year slice
+        rows = np.sort(np.concatenate([_index.get(g, []) for g in genres]).astype(np.intp))
+        rows = rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)]
+    else:
+        rows = np.arange(lo, hi, dtype=np.intp)
+
+    # NaN compares False, so rows missing a rating or budget drop out
+    mask = range_mask(
+        rows,
+        _arrays["averageRating"],
+        _arrays["budget"],
+        *rating_range,
+        *budget_range,
+    )
+    return _df.iloc[rows[mask]]
+
+
+genres_key = tuple(sorted(selected_genres))
+df_filtered = apply_filters(
+    data_version,
+    df,
+    filter_arrays,
+    genre_index,
+    years,
+    genres_key,
+    rating_range,
+    budget_range,
+)
+
+# --------------------------------------------------------------------------------------
+# Map builder (HTML is kept in st.session_state per filter combination)
+# --------------------------------------------------------------------------------------
+def bin_points(df_map, precision=1):
+    """Aggregate points into lat/lon grid cells of `precision` degrees."""
+    return (
+        df_map.assign(
+            latb=(df_map["lat"] / precision).round() * precision,
+            lonb=(df_map["lon"] / precision).round() * precision,
+        )
+        .groupby(["latb", "lonb"], sort=False)
+        .agg(n=("title", "size"), avg_rating=("averageRating", "mean"))
+        .reset_index()
+    )
 
-# Year filter
-df_filtered = df_filtered[df_filtered["startYear"].between(years[0], years[1])]
 
-# Genre filter
-if selected_genres:
-    df_filtered = df_filtered[df_filtered["genres"].isin(selected_genres)]
+MARKER_CALLBACK = """
+function (row) {
+    var marker = L.marker(new L.LatLng(row[0], row[1]));
+    marker.bindPopup(row[2]);
+    marker.bindTooltip(row[3]);
+    return marker;
+};
+"""
+
+
+def build_map(df_map, aggregate=False, precision=1.0):
+    center_lat = df_map["lat"].mean()
+    center_lon = df_map["lon"].mean()
+
+    m = folium.Map(
+        location=[center_lat, center_lon],
+        zoom_start=2,
+        tiles=None,
+        prefer_canvas=True,
+        no_wrap=True,
+    )
+    folium.TileLayer(
+        "cartodbpositron",
+        name="BaseMap",
+        control=False,
+        no_wrap=True,
+    ).add_to(m)
+
+    if aggregate:
+        # One circle per grid cell, radius scaled by log2 of the movie count
+        layer = folium.FeatureGroup(name="Filming Locations").add_to(m)
+        for latb, lonb, n, avg_rating in bin_points(df_map, precision).itertuples(index=False):
+            rating = f"{avg_rating:.2f}" if pd.notna(avg_rating) else "N/A"
+            folium.CircleMarker(
+                location=[latb, lonb],
+                radius=max(7, 7 + 10 * np.log2(n + 1)),
+                fill=True,
+                fill_opacity=0.6,
+                weight=1,
+                popup=f"Movies: {n:,}<br>Avg Rating: {rating}",
+                tooltip=f"{n:,} movies",
+            ).add_to(layer)
+    else:
+        # Rows are shipped as a plain JS array: [lat, lon, popup_html, title]
+        FastMarkerCluster(
+            data=df_map[["lat", "lon", "popup_html"]]
+            .assign(title=df_map["title"].fillna("N/A"))
+            .values.tolist(),
+            callback=MARKER_CALLBACK,
+            name="Filming Locations",
+            disableClusteringAtZoom=5,
+        ).add_to(m)
 
-# Rating filter
-df_filtered = df_filtered[
-    df_filtered["averageRating"].between(rating_range[0], rating_range[1])
-]
+    folium.LayerControl(collapsed=False).add_to(m)
+
+    return m
 
-# Budget filter
-df_filtered = df_filtered[
-    df_filtered["budget"].between(budget_range[0], budget_range[1])
-]
 
 # --------------------------------------------------------------------------------------
 # Tabs: Map / Trends / Data
@@ -149,65 +322,67 @@ df_filtered = df_filtered[
 tab_map, tab_trends, tab_table = st.tabs(["🌍 Map", "📈 Trends", "📋 Data"])
 
 # --------------------------------------------------------------------------------------
-# 🌍 Tab 1: Folium Map
+# 🌍 Tab 1: Map (pydeck by default, folium for high detail)
 # --------------------------------------------------------------------------------------
 with tab_map:
     st.subheader("Filming Locations and Movie Success (Average Rating)")
 
-    df_map = df_filtered.dropna(subset=["lat", "lon"]).copy()
+    df_map = df_filtered.loc[
+        df_filtered["lat"].notna().to_numpy() & df_filtered["lon"].notna().to_numpy()
+    ]
 
     if df_filtered.empty:
         st.info("No data for the selected filters.")
     elif df_map.empty:
         st.info("No movies with valid latitude/longitude after filtering.")
     else:
-        center_lat = df_map["lat"].mean()
-        center_lon = df_map["lon"].mean()
-
-        m = folium.Map(
-            location=[center_lat, center_lon],
-            zoom_start=2,
-            tiles=None,
-            prefer_canvas=True,
-            no_wrap=True,
+        high_detail = st.checkbox(
+            "High-detail map (popups per movie, slower for >1000 points)",
+            value=len(df_map) <= 1000,
         )
-        folium.TileLayer(
-            "cartodbpositron",
-            name="BaseMap",
-            control=False,
-            no_wrap=True,
-        ).add_to(m)
-
-        cluster = MarkerCluster(
-            name="Filming Locations",
-            disableClusteringAtZoom=5,
-        ).add_to(m)
-
-        for _, row in df_map.iterrows():
-            title = row["title"]
-            year = int(row["startYear"]) if not pd.isna(row["startYear"]) else "N/A"
-            genre = row["genres"] if not pd.isna(row["genres"]) else "N/A"
-            rating = round(row["averageRating"], 2) if not pd.isna(row["averageRating"]) else "N/A"
-            budget = int(row["budget"]) if not pd.isna(row["budget"]) else "N/A"
-
-            popup_lines = [
-                f"<b>{title}</b>",
-                f"Year: {year}",
-                f"Genre: {genre}",
-                f"Rating: {rating}",
-                f"Budget: {budget:,}" if budget != "N/A" else "Budget: N/A",
-            ]
-            popup_html = "<br>".join(popup_lines)
 
-            folium.Marker(
-                location=[row["lat"], row["lon"]],
-                popup=popup_html,
-                tooltip=title,
-            ).add_to(cluster)
+        if not high_detail:
+            # WebGL scatter layer: rendered on the GPU, scales to 100k+ points
+            layer = pdk.Layer(
+                "ScatterplotLayer",
+                data=df_map[["lat", "lon", "title", "averageRating"]],
+                get_position=["lon", "lat"],
+                get_radius=20000,
+                radius_min_pixels=2,
+                get_fill_color="[255 * (1 - averageRating / 10), 255 * (averageRating / 10), 80, 180]",
+                pickable=True,
+            )
+            st.pydeck_chart(
+                pdk.Deck(
+                    layers=[layer],
+                    initial_view_state=pdk.ViewState(
+                        latitude=float(df_map["lat"].mean()),
+                        longitude=float(df_map["lon"].mean()),
+                        zoom=2,
+                    ),
+                    map_style="light",
+                    tooltip={"html": "<b>{title}</b><br>Rating: {averageRating}"},
+                ),
+                use_container_width=True,
+            )
+        else:
+            aggregate = st.checkbox("Aggregate markers", value=len(df_map) > 3000)
+            precision = 1.0
+            if aggregate:
+                precision = st.select_slider(
+                    "Grid size (degrees)",
+                    options=[0.25, 0.5, 1.0, 2.0, 5.0],
+                    value=1.0,
+                )
 
-        folium.LayerControl(collapsed=False).add_to(m)
+            # Rebuild only when the data, filters or map options change
+            map_key = (data_version, years, genres_key, rating_range, budget_range, aggregate, precision)
+            if st.session_state.get("map_key") != map_key:
+                # Full standalone page (not the notebook wrapper) so the map fills the frame
+                st.session_state["map_html"] = build_map(df_map, aggregate, precision).get_root().render()
+                st.session_state["map_key"] = map_key
 
-        st_folium(m, width=1100, height=600)
+            st.iframe(st.session_state["map_html"], width=1100, height=600)
 
 # --------------------------------------------------------------------------------------
 # 📈 Tab 2: Trends (Rating by Year/Genre + Budget vs Rating)
@@ -224,25 +399,31 @@ with tab_trends:
         with col1:
             st.markdown("**Average Rating by Year and Genre**")
 
-            df_group = (
-                df_filtered
-                .dropna(subset=["startYear", "genres", "averageRating"])
-                .groupby(["startYear", "genres"], as_index=False)["averageRating"]
-                .mean()
-                .rename(columns={"startYear": "year", "averageRating": "avg_rating"})
+            trend_cols = ["startYear", "genres", "averageRating"]
+            has_trend_data = df_filtered[trend_cols].notna().all(axis=1).to_numpy()
+
+            # Compact records (int years, rounded means) are inlined straight into the spec
+            trend_records = (
+                df_filtered.loc[has_trend_data, trend_cols]
+                .groupby(["startYear", "genres"], sort=False, observed=True, as_index=False)
+                .agg(avg_rating=("averageRating", "mean"))
+                .astype({"startYear": "int32"})
+                .round({"avg_rating": 2})
+                .rename(columns={"startYear": "year"})
+                .to_dict(orient="records")
             )
 
-            if df_group.empty:
+            if not trend_records:
                 st.info("No grouped data to display trends.")
             else:
                 chart = (
-                    alt.Chart(df_group)
+                    alt.Chart(alt.InlineData(values=trend_records))
                     .mark_line()
                     .encode(
                         x=alt.X("year:O", title="Year"),
                         y=alt.Y("avg_rating:Q", title="Average Rating"),
                         color=alt.Color("genres:N", title="Genre"),
-                        tooltip=["year", "genres", "avg_rating"],
+                        tooltip=["year:O", "genres:N", "avg_rating:Q"],
                     )
                     .properties(height=350)
                 )
@@ -252,11 +433,20 @@ with tab_trends:
         with col2:
             st.markdown("**Budget(USD) vs Average Rating**")
 
-            df_scatter = df_filtered.dropna(subset=["budget", "averageRating"]).copy()
+            df_scatter = df_filtered.loc[
+                df_filtered["budget"].notna().to_numpy()
+                & df_filtered["averageRating"].notna().to_numpy(),
+                ["title", "startYear", "genres", "budget", "averageRating"],
+            ]
 
             if df_scatter.empty:
                 st.info("No data with both budget and rating.")
             else:
+                # Sample server-side so the inline Vega-Lite payload stays bounded
+                if len(df_scatter) > SCATTER_MAX_POINTS:
+                    df_scatter = df_scatter.sample(n=SCATTER_MAX_POINTS, random_state=0)
+                    st.caption(f"Showing a random sample of {SCATTER_MAX_POINTS:,} movies.")
+
                 chart2 = (
                     alt.Chart(df_scatter)
                     .mark_circle(size=60, opacity=0.65)
@@ -294,8 +484,24 @@ with tab_table:
             "lon",
         ]
 
-        df_display = df_filtered[columns_to_show].sort_values(
-            by=["startYear","averageRating","budget","numVotes"], ascending=False, na_position="last"
+        # Descending by year, rating, budget, votes (NaN last): lexsort takes the
+        # primary key last, and -inf for missing values puts them at the end once reversed
+        sort_keys = ["numVotes", "budget", "averageRating", "startYear"]
+        order = np.lexsort([
+            # cast to float first: int32 columns cannot hold the -inf fill value
+            df_filtered[col].astype("float64[pyarrow]").to_numpy(dtype=np.float64, na_value=-np.inf)
+            for col in sort_keys
+        ])[::-1]
+
+        # Only the visible page is serialized and sent to the browser
+        n_pages = max(1, -(-len(order) // TABLE_PAGE_SIZE))
+        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1)
+        start = (page - 1) * TABLE_PAGE_SIZE
+        page_rows = order[start:start + TABLE_PAGE_SIZE]
+        st.caption(
+            f"Rows {start + 1:,}–{start + len(page_rows):,} of {len(order):,} (page {page} of {n_pages})"
         )
 
+        df_display = df_filtered[columns_to_show].iloc[page_rows]
+
         st.dataframe(df_display, use_container_width=True)
\ No newline at end of file
@@ -0,0 +1,179 @@
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+SCRIPT = Path(__file__).resolve().parents[1] / "streamlit_movie.py"
+
+
+def movies_frame():
+    # "Low"/"High" sit outside the default filters; the rest pass them
+    return pd.DataFrame(
+        {
+            "title": ["Low", "Alpha", "Beta", None, "Delta", "High"],
+            "startYear": [1990, 2001, 2005, 2010, None, 1990],
+            "genres": ["Horror", "Action", "Comedy", "Drama", "\\N", "Horror"],
+            "averageRating": [3.0, 7.3, 8.2, 6.1, 5.0, 4.0],
+            "budget": [100, 1_000_000, 20_000_001, 5_000_000, 3_000_000, 1_000_000_000],
+            "numVotes": [10, 1200, None, 300, 40, 20],
+            "lat": [10.0, 40.7, 34.1, 51.5, None, 20.0],
+            "lon": [10.0, -74.0, -118.2, -0.1, None, 20.0],
+        }
+    )
+
+
+def run_app():
+    return AppTest.from_file(str(SCRIPT), default_timeout=60).run()
+
+
+@pytest.fixture
+def movies_dir(tmp_path, monkeypatch):
+    st.cache_data.clear()
+    movies_frame().to_csv(tmp_path / "movies_with_coords.csv", index=False)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_data_table_sorts_rows_with_null_num_votes(movies_dir):
+    at = run_app()
+
+    assert not at.exception
+    table = at.dataframe[0].value
+    assert table["startYear"].tolist() == [2010, 2005, 2001]
+    assert table["numVotes"].isna().tolist() == [False, True, False]
+
+
+def test_updated_csv_replaces_filtered_rows(movies_dir):
+    csv_path = movies_dir / "movies_with_coords.csv"
+    assert run_app().dataframe[0].value["title"].tolist()[1:] == ["Beta", "Alpha"]
+
+    # Same bounds and filters, new titles; bump the mtime past the parquet file
+    movies = movies_frame()
+    movies["title"] = "NEW " + movies["title"].fillna("?")
+    movies.to_csv(csv_path, index=False)
+    mtime = os.path.getmtime(movies_dir / "movies_with_coords.parquet") + 10
+    os.utime(csv_path, (mtime, mtime))
+
+    at = run_app()
+    assert not at.exception
+    assert at.dataframe[0].value["title"].tolist() == ["NEW ?", "NEW Beta", "NEW Alpha"]
+
+
+def test_map_payload_keeps_coordinates_exact(movies_dir):
+    at = run_app()
+
+    srcdoc = at.get("iframe")[0].proto.srcdoc
+    assert "[40.7, -74.0," in srcdoc
+    assert "40.70000" not in srcdoc
+
+
+def random_movies(n=4000, seed=0):
+    rng = np.random.default_rng(seed)
+
+    def with_nulls(values, frac=0.05):
+        values = pd.Series(values, dtype="object")
+        values[rng.random(n) < frac] = None
+        return values
+
+    return pd.DataFrame(
+        {
+            "title": [f"Movie {i}" for i in range(n)],
+            "startYear": with_nulls(rng.integers(1990, 2021, n)),
+            "genres": with_nulls(rng.choice(["Action", "Comedy", "Drama", "Horror", "\\N"], n)),
+            "averageRating": with_nulls(rng.integers(10, 101, n) / 10),
+            "budget": with_nulls(rng.integers(1, 400, n) * 250_000),
+            "numVotes": with_nulls(rng.integers(5, 100_000, n)),
+            "lat": with_nulls(rng.uniform(-60, 70, n)),
+            "lon": with_nulls(rng.uniform(-180, 180, n)),
+        }
+    )
+
+
+def baseline_filter(movies, years, genres, rating_range, budget_range):
+    # The original pandas filter chain from before the indexed filter path
+    for col in ["startYear", "averageRating", "budget", "numVotes"]:
+        movies[col] = pd.to_numeric(movies[col], errors="coerce")
+    movies["genres"] = movies["genres"].replace("\\N", np.nan)
+
+    out = movies[movies["startYear"].between(*years)]
+    if genres:
+        out = out[out["genres"].isin(genres)]
+    out = out[out["averageRating"].between(*rating_range)]
+    out = out[out["budget"].between(*budget_range)]
+    return out.sort_values(
+        by=["startYear", "averageRating", "budget", "numVotes"], ascending=False, na_position="last"
+    )
+
+
+def total_rows(at):
+    captions = [c.value for c in at.caption if c.value.startswith("Rows ")]
+    if not captions:
+        return 0
+    return int(re.search(r" of ([\d,]+) ", captions[0]).group(1).replace(",", ""))
+
+
+@pytest.fixture
+def random_movies_dir(tmp_path, monkeypatch):
+    st.cache_data.clear()
+    movies = random_movies()
+    movies.to_csv(tmp_path / "movies_with_coords.csv", index=False)
+    monkeypatch.chdir(tmp_path)
+    return movies
+
+
+@pytest.mark.parametrize(
+    "years, genres, rating_range, budget_edges",
+    [
+        pytest.param((2005, 2005), ["Action", "Comedy", "Drama"], None, None, id="single-year"),
+        pytest.param((1990, 2020), [], None, None, id="no-genres"),
+        pytest.param((2000, 2010), ["Horror"], (7.3, 7.3), None, id="rating-edge"),
+        pytest.param((1995, 2015), ["Drama", "Action"], (2.0, 8.5), (10, 20), id="budget-edges"),
+    ],
+)
+def test_filters_match_baseline(random_movies_dir, years, genres, rating_range, budget_edges):
+    at = run_app()
+    year_slider, budget_slider, rating_slider = at.sidebar.slider
+
+    year_slider.set_value(years)
+    at.sidebar.multiselect[0].set_value(genres)
+    if rating_range is None:
+        rating_range = (rating_slider.min, rating_slider.max)
+    rating_slider.set_value(rating_range)
+
+    # Budget bounds are exact budgets from the data, inside the slider's range
+    budgets = np.sort(pd.to_numeric(random_movies_dir["budget"]).dropna().unique())
+    budgets = budgets[(budgets >= budget_slider.min) & (budgets <= budget_slider.max)]
+    budget_range = (budget_slider.min, budget_slider.max)
+    if budget_edges is not None:
+        budget_range = (float(budgets[budget_edges[0]]), float(budgets[budget_edges[1]]))
+    budget_slider.set_value(budget_range)
+    at.run()
+
+    expected = baseline_filter(random_movies_dir.copy(), years, genres, rating_range, budget_range)
+    assert not at.exception
+    assert len(expected) > 0
+    assert total_rows(at) == len(expected)
+
+    keys = ["startYear", "averageRating", "budget", "numVotes"]
+    page = at.dataframe[0].value[keys].astype("float64").fillna(-1)
+    assert page.values.tolist() == expected[keys].head(100).astype("float64").fillna(-1).values.tolist()
+
+
+def test_genre_with_no_rows_in_year_range(random_movies_dir):
+    movies = random_movies_dir
+    movies.loc[movies.index[:3], ["startYear", "genres"]] = [1990, "Western"]
+    movies.to_csv("movies_with_coords.csv", index=False)
+
+    at = run_app()
+    at.sidebar.slider[0].set_value((2000, 2020))
+    at.sidebar.multiselect[0].set_value(["Western"])
+    at.run()
+
+    assert not at.exception
+    assert total_rows(at) == 0
+    assert "No data for the selected filters." in [i.value for i in at.info]